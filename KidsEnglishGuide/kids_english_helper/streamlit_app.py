@@ -1,13 +1,68 @@
-import os, json, requests, streamlit as st
-from dotenv import load_dotenv
+import os, json, orjson, streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
 
-load_dotenv()
+
+# set_page_config는 반드시 첫 Streamlit 호출이어야 함 (캐시 함수보다 먼저)
 st.set_page_config(page_title="Kids English Helper (MVP)", page_icon="🔎", layout="wide")
 
 
+@st.cache_resource(show_spinner=False)
+def _load_env() -> bool:
+    """.env 파싱(디스크 I/O)을 프로세스당 1회로 제한 — dotenv 임포트도 여기서만"""
+    from dotenv import load_dotenv
+    return load_dotenv()
+
+
+_load_env()
+
+
+@st.cache_data(show_spinner=False)
 def get_secret(name: str, default: str = "") -> str:
+    """secrets/환경변수 조회를 rerun마다 반복하지 않도록 서버 전역 캐시에 고정"""
     return st.secrets.get(name, os.getenv(name, default))
 
+
+@st.cache_resource
+def _http() -> "requests.Session":
+    """Pooled HTTP session shared across reruns (keep-alive, no per-call TLS handshake)"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    s = requests.Session()
+    s.headers.update({"Content-Type": "application/json"})
+    # POST는 기본적으로 재시도 대상이 아니므로 allowed_methods에 명시 (검색/챗 호출은 멱등)
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "POST"),
+        respect_retry_after_header=True,
+    )
+    s.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+    return s
+
+
+@st.cache_resource
+def _executor() -> ThreadPoolExecutor:
+    """Worker pool for overlapping slow HTTP calls with rendering"""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def _submit_with_ctx(fn, *args):
+    """ScriptRunContext를 워커에 붙여 submit — 없으면 cache_data/resource가 무시됨"""
+    import threading
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+
+    def run(*a):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*a)
+
+    return _executor().submit(run, *args)
+
 # Azure AI Search
 SEARCH_ENDPOINT = get_secret("AZURE_SEARCH_ENDPOINT")
 SEARCH_KEY = get_secret("AZURE_SEARCH_KEY")
@@ -18,109 +73,212 @@ AOAI_ENDPOINT = get_secret("AZURE_OPENAI_ENDPOINT")
 AOAI_KEY = get_secret("AZURE_OPENAI_KEY")
 AOAI_DEPLOYMENT = get_secret("AZURE_OPENAI_DEPLOYMENT")
 
+# 이미지와 함께 선택할 수 있는 캐릭터/주제 리스트
+SEARCH_OPTIONS = [
+    {"label": "Bluey", "image": "https://upload.wikimedia.org/wikipedia/en/0/0a/Bluey_%28cartoon_character%29.png"},
+    {"label": "Peppa Pig", "image": "https://upload.wikimedia.org/wikipedia/en/e/e7/Peppa_Pig_character.png"},
+    {"label": "Dinosaur", "image": "https://upload.wikimedia.org/wikipedia/commons/6/6e/Dinosaur.png"},
+    {"label": "Disney/Pixar", "image": "https://upload.wikimedia.org/wikipedia/commons/3/3e/Disney%2B_logo.svg"},
+    {"label": "Pororo", "image": "https://upload.wikimedia.org/wikipedia/ko/2/2c/Pororo.png"},
+    {"label": "기타", "image": "https://upload.wikimedia.org/wikipedia/commons/6/65/Question_mark_%28black%29.svg"},
+]
+
+# 임시로 embed, 실제로는 API 필요하지만, 대표 영상 3개만 임베드
+YT_SAMPLES = {
+    "Bluey": [
+        "https://www.youtube.com/embed/9JkQOYwYv6A",
+        "https://www.youtube.com/embed/6R3NQb6pQ1w",
+        "https://www.youtube.com/embed/4b6bLr2Qb6E"
+    ],
+    "Peppa Pig": [
+        "https://www.youtube.com/embed/9wK6A2eA5nA",
+        "https://www.youtube.com/embed/1S9UeQnUnxw",
+        "https://www.youtube.com/embed/2pLT-olgUJs"
+    ],
+    "Dinosaur": [
+        "https://www.youtube.com/embed/3o5y6z5l5xw",
+        "https://www.youtube.com/embed/2pLT-olgUJs",
+        "https://www.youtube.com/embed/1S9UeQnUnxw"
+    ],
+    "Disney/Pixar": [
+        "https://www.youtube.com/embed/0mvM6p5oQ9A",
+        "https://www.youtube.com/embed/6Qe6p6p6p6A",
+        "https://www.youtube.com/embed/7Qe7p7p7p7A"
+    ],
+    "Pororo": [
+        "https://www.youtube.com/embed/8Qe8p8p8p8A",
+        "https://www.youtube.com/embed/9Qe9p9p9p9A",
+        "https://www.youtube.com/embed/0Qe0p0p0p0A"
+    ],
+    "기타": []
+}
+
+# 프리셋 검색어는 인코딩까지 미리 계산 (자유 입력은 클릭 시 인코딩)
+YT_QUERIES = {k: quote_plus(k + " cartoon") for k in YT_SAMPLES}
+
+
+@st.cache_data(show_spinner=False)
+def _json_bytes(obj) -> bytes:
+    """다운로드 버튼용 pretty JSON — 같은 객체는 rerun마다 재인코딩하지 않음"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_img(url: str) -> bytes:
+    """Character thumbnail, downloaded once per day instead of per rerun"""
+    r = _http().get(url, timeout=10)
+    r.raise_for_status()
+    return r.content
+
+
+def _yt_oembed(session, url: str):
+    """유튜브 oEmbed 메타데이터(제목 등) 1건 조회 — 실패 시 None"""
+    watch = url.replace("/embed/", "/watch?v=")
+    try:
+        r = session.get("https://www.youtube.com/oembed",
+                        params={"url": watch, "format": "json"}, timeout=10)
+        r.raise_for_status()
+        return r.json()
+    except Exception:
+        return None
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _yt_metadata(urls: tuple):
+    """영상 3건의 oEmbed 조회를 직렬 3 RTT 대신 병렬로 fan-out"""
+    # 세션은 메인 스레드에서 1회 조회해 전달 — 워커에서는 cache_resource가 동작하지 않음
+    session = _http()
+    return list(_executor().map(lambda u: _yt_oembed(session, u), urls))
+
+
+@st.cache_data(ttl=600, max_entries=128, show_spinner=False)
+def _search_request(query: str, top: int):
+    """Simple REST call to Azure AI Search (memoized per (query, top))"""
+    url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}/docs/search?api-version=2023-11-01"
+    payload = {"search": query, "top": top, "queryType": "simple"}
+    # 세션이 Content-Type을 이미 지정하므로 orjson 바이트를 그대로 전송
+    r = _http().post(url, headers={"api-key": SEARCH_KEY}, data=orjson.dumps(payload), timeout=30)
+    r.raise_for_status()
+    return orjson.loads(r.content).get("value", [])
+
+
+def _normalize_docs(docs):
+    """저장 전에 1회만 절단 — 렌더링과 RAG가 같은 문자열을 재사용 (rerun마다 재절단 방지)"""
+    for d in docs:
+        d["title"] = d.get("title") or d.get("id", "")
+        content = d.get("content") or ""
+        d["content"] = content[:600]
+        d["_content_preview"] = content[:300] + ("..." if len(content) > 300 else "")
+        d["_phrases_joined"] = ", ".join(d.get("phrases", []))
+    return docs
+
 
 def azure_search(query: str, top: int = 5):
-    """Simple REST call to Azure AI Search"""
     if not (SEARCH_ENDPOINT and SEARCH_KEY and SEARCH_INDEX):
         st.warning("Azure AI Search 설정이 필요합니다.")
         return []
 
-    url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}/docs/search?api-version=2023-11-01"
-    headers = {"Content-Type": "application/json", "api-key": SEARCH_KEY}
-    payload = {"search": query, "top": top, "queryType": "simple"}
-
     try:
-        r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        return data.get("value", [])
+        return _normalize_docs(_search_request(query, top))
     except Exception as e:
         st.error(f"검색 호출 실패: {e}")
         return []
 
 
 # === Azure OpenAI (RAG) ===
-def aoai_chat(messages, temperature=0.3, max_tokens=800):
-    if not (AOAI_ENDPOINT and AOAI_KEY and AOAI_DEPLOYMENT):
-        st.warning("Azure OpenAI 설정이 필요합니다.")
-        return None
+@st.cache_resource
+def _aoai_client():
+    """AzureOpenAI 클라이언트 1회 생성 — 내부 httpx 커넥션 keep-alive/재시도 재사용"""
+    from openai import AzureOpenAI
+    return AzureOpenAI(azure_endpoint=AOAI_ENDPOINT, api_key=AOAI_KEY,
+                       api_version="2024-06-01", max_retries=3)
 
-    url = f"{AOAI_ENDPOINT}/openai/deployments/{AOAI_DEPLOYMENT}/chat/completions?api-version=2024-06-01"
-    headers = {"Content-Type": "application/json", "api-key": AOAI_KEY}
-    payload = {
-        "messages": messages,
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-        "response_format": {"type": "json_object"}
-    }
 
-    try:
-        r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=60)
-        r.raise_for_status()
-        data = r.json()
-        content = data["choices"][0]["message"]["content"]
-        return json.loads(content)
-    except Exception as e:
-        st.error(f"AOAI 호출 실패: {e}")
-        return None
+@st.cache_data(ttl=600, max_entries=64, show_spinner=False)
+def _chat_request(_client, messages_json: str, temperature: float, max_tokens: int):
+    """Chat-completions call memoized on the serialized messages (SDK 스트리밍 수신)
+
+    _client는 언더스코어 규약으로 캐시 키에서 제외 — 메인 스레드에서 만든
+    AzureOpenAI 인스턴스를 받아 워커에서 커넥션 풀을 재사용한다.
+    """
+    stream = _client.chat.completions.create(
+        model=AOAI_DEPLOYMENT,
+        messages=json.loads(messages_json),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},
+        stream=True,
+        timeout=60,
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return orjson.loads("".join(parts))
+
+
+_RAG_SYSTEM = (
+    "You are a kids English coach. Return JSON only. "
+    "Make outputs short, A1~A2 friendly, and actionable for parents."
+)
+_RAG_TASK = "Create child-friendly summary + key phrases + 3 missions + parent coaching for the query"
+_RAG_OUTPUT_SCHEMA = {
+    "summary": "2-3 sentences for a child",
+    "focus_phrases": ["...", "...", "..."],
+    "missions": ["find expression", "shadowing 2x", "use at home once"],
+    "parent_tips": ["praise line 1", "rule/tip 1"]
+}
+
+# user 메시지의 고정 부분은 미리 직렬화 — 호출 시에는 query/docs만 인코딩
+_RAG_USER_HEAD = f'{{"task":{orjson.dumps(_RAG_TASK).decode()},"query":'
+_RAG_USER_MID = ',"docs":'
+_RAG_USER_TAIL = f',"output_schema":{orjson.dumps(_RAG_OUTPUT_SCHEMA).decode()}}}'
 
 
 def build_rag_prompt(query, docs):
     # compress docs for prompt
-    snippets = []
-    for d in docs:
-        title = d.get("title") or d.get("id", "")
-        series = d.get("series", "")
-        level = d.get("level", "")
-        content = (d.get("content", "") or "")[:600]
-        phrases = d.get("phrases", [])
-        snippets.append({
-            "title": title, "series": series, "level": level,
-            "phrases": phrases, "content": content
-        })
-
-    system = (
-        "You are a kids English coach. Return JSON only. "
-        "Make outputs short, A1~A2 friendly, and actionable for parents."
-    )
-    user = {
-        "task": "Create child-friendly summary + key phrases + 3 missions + parent coaching for the query",
-        "query": query,
-        "docs": snippets,
-        "output_schema": {
-            "summary": "2-3 sentences for a child",
-            "focus_phrases": ["...", "...", "..."],
-            "missions": ["find expression", "shadowing 2x", "use at home once"],
-            "parent_tips": ["praise line 1", "rule/tip 1"]
-        }
-    }
-    messages = [
-        {"role": "system", "content": system},
-        {"role": "user", "content": json.dumps(user, ensure_ascii=False)}
+    snippets = [{
+        "title": d.get("title") or d.get("id", ""),
+        "series": d.get("series", ""),
+        "level": d.get("level", ""),
+        "phrases": d.get("phrases", []),
+        "content": d.get("content", "")  # _normalize_docs가 이미 600자로 절단
+    } for d in docs]
+
+    content = (_RAG_USER_HEAD + orjson.dumps(query).decode()
+               + _RAG_USER_MID + orjson.dumps(snippets).decode() + _RAG_USER_TAIL)
+    return [
+        {"role": "system", "content": _RAG_SYSTEM},
+        {"role": "user", "content": content}
     ]
-    return messages
 
 
 # === Rule-based weekly planner ===
+_FOCUS_BANK = {
+    "A0": ("Hello!", "My name is ...", "I like ..."),
+    "A1": ("Can I ...?", "I want ...", "It's my turn."),
+    "A2": ("Yesterday I ...", "Because ...", "Let's try ..."),
+    "B1": ("In my opinion ...", "I prefer ...", "Be careful!"),
+}
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_ACTIVITY_TYPES = ("듣기", "말하기", "읽기", "쓰기")
+_MISSIONS = ("표현 스티커 찾기", "섀도잉 2회", "가정 대화 1회 사용")
+
+# 카드 렌더링용 문자열은 rerun마다 join하지 않도록 미리 계산
+_FOCUS_JOINED = {k: ", ".join(v) for k, v in _FOCUS_BANK.items()}
+_MISSIONS_JOINED = ", ".join(_MISSIONS)
+
+
 def rule_based_plan(age: int, level: str, character: str, sessions_per_week: int = 4, minutes_per_session: int = 15):
-    focus_bank = {
-        "A0": ["Hello!", "My name is ...", "I like ..."],
-        "A1": ["Can I ...?", "I want ...", "It's my turn."],
-        "A2": ["Yesterday I ...", "Because ...", "Let's try ..."],
-        "B1": ["In my opinion ...", "I prefer ...", "Be careful!"],
-    }
-    phrases = focus_bank.get(level, focus_bank["A1"])
-
-    activities = []
-    days = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-    for i in range(sessions_per_week):
-        activities.append({
-            "day": days[i % 7],
-            "type": ["듣기","말하기","읽기","쓰기"][i % 4],
-            "item": f"{character} clip/read",
-            "focus_phrases": phrases,
-            "missions": ["표현 스티커 찾기", "섀도잉 2회", "가정 대화 1회 사용"]
-        })
+    phrases = _FOCUS_BANK.get(level, _FOCUS_BANK["A1"])
+    item = f"{character} clip/read"
+    activities = [{
+        "day": _DAYS[i % 7],
+        "type": _ACTIVITY_TYPES[i % 4],
+        "item": item,
+        "focus_phrases": phrases,
+        "missions": _MISSIONS
+    } for i in range(sessions_per_week)]
     return {
         "weekly_goals": f"{sessions_per_week}회 × {minutes_per_session}분 / 회",
         "activities": activities,
@@ -132,34 +290,38 @@ st.title("Kids English Helper (MVP)")
 tabs = st.tabs(["🔎 Search", "🗓 Plan", "⚙️ Settings"])
 
 # --- Search tab ---
-with tabs[0]:
+@st.fragment
+def _search_tab():
     st.subheader("KIDS 영어 콘텐츠 검색")
     # 검색어를 이미지로 선택하게 변경 예를 들어 블루이 페파피그 공룡등
 
-    # 이미지와 함께 선택할 수 있는 캐릭터/주제 리스트
-    search_options = [
-        {"label": "Bluey", "image": "https://upload.wikimedia.org/wikipedia/en/0/0a/Bluey_%28cartoon_character%29.png"},
-        {"label": "Peppa Pig", "image": "https://upload.wikimedia.org/wikipedia/en/e/e7/Peppa_Pig_character.png"},
-        {"label": "Dinosaur", "image": "https://upload.wikimedia.org/wikipedia/commons/6/6e/Dinosaur.png"},
-        {"label": "Disney/Pixar", "image": "https://upload.wikimedia.org/wikipedia/commons/3/3e/Disney%2B_logo.svg"},
-        {"label": "Pororo", "image": "https://upload.wikimedia.org/wikipedia/ko/2/2c/Pororo.png"},
-        {"label": "기타", "image": "https://upload.wikimedia.org/wikipedia/commons/6/65/Question_mark_%28black%29.svg"},
-    ]
+    # 위젯 변경으로 인한 rerun에도 선택/검색 결과가 유지되도록 session_state 사용
+    st.session_state.setdefault("selected_q", "")
+    st.session_state.setdefault("results", None)
+    st.session_state.setdefault("last_q", "")
+    st.session_state.setdefault("rag", None)
 
-    
     # 이미지 버튼 UI (이미지가 실제로 보이도록 st.image 사용)
-    cols = st.columns(len(search_options))
-    selected_idx = None
-    for i, opt in enumerate(search_options):
+    cols = st.columns(len(SEARCH_OPTIONS))
+    for i, opt in enumerate(SEARCH_OPTIONS):
         with cols[i]:
-            st.image(opt["image"], width=80)  # 이미지 크기 동일하게
+            url = opt["image"]
+            try:
+                # SVG 바이트는 PIL이 못 읽으므로 URL 그대로 전달 (브라우저가 렌더링)
+                img = url if url.endswith(".svg") else _fetch_img(url)
+            except Exception:
+                img = url  # 다운로드 실패 시 URL로 폴백
+            st.image(img, width=80)  # 이미지 크기 동일하게
             if st.button(opt["label"], use_container_width=True, key=f"imgbtn_{i}"):
-                selected_idx = i
-                
-    # 선택된 검색어
-    if selected_idx is not None:
-        q = search_options[selected_idx]["label"]
+                st.session_state.selected_q = opt["label"]
+
+    # 선택된 검색어 (클릭 이후의 rerun에도 유지됨)
+    if st.session_state.selected_q:
+        q = st.session_state.selected_q
         st.success(f"선택된 검색어: {q}")
+        if st.button("선택 해제"):
+            st.session_state.selected_q = ""
+            st.rerun()
     else:
         q = st.text_input("검색어 입력 (예: Bluey, Peppa Pig, dinosaur)", "")
 
@@ -169,93 +331,82 @@ with tabs[0]:
     top = st.slider("Top N", 1, 20, 5)
     do_rag = st.checkbox("상위 검색 결과로  (Azure OpenAI 필요)", value=False)
 
-    # ...existing code...
+    # "검색 실행" 클릭에만 네트워크 호출; 이후 rerun은 session_state 렌더링만 수행
+    rag_future = None
     if st.button("검색 실행", use_container_width=True):
         results = azure_search(q, top=top)
+        st.session_state.results = results
+        st.session_state.last_q = q
+        st.session_state.rag = None
+        if results and do_rag:
+            # RAG 호출을 백그라운드로 먼저 띄워 결과/유튜브 렌더링과 겹치게 함
+            if AOAI_ENDPOINT and AOAI_KEY and AOAI_DEPLOYMENT:
+                messages = build_rag_prompt(q, results)
+                rag_future = _submit_with_ctx(
+                    _chat_request, _aoai_client(), json.dumps(messages, sort_keys=True), 0.3, 800)
+            else:
+                st.warning("Azure OpenAI 설정이 필요합니다.")
+
+    results = st.session_state.results
+    if results is not None:
+        q = st.session_state.last_q
         if not results:
             st.info("검색 결과가 없습니다.")
         else:
             for doc in results:
+                g = doc.get  # 메서드 조회를 카드당 1회로
                 with st.container(border=True):
-                    title = doc.get("title") or doc.get("id")
-                    series = doc.get("series", "")
-                    level = doc.get("level", "")
-                    st.markdown(f"**{title}**  •  {series}  •  {level}")
-                    content = doc.get("content", "")
-                    if content:
-                        st.write(content[:300] + ("..." if len(content) > 300 else ""))
-                    phrases = doc.get("phrases", [])
-                    if phrases:
-                        st.caption("키 프레이즈: " + ", ".join(phrases))
+                    st.markdown(f"**{doc['title']}**  •  {g('series', '')}  •  {g('level', '')}")
+                    preview = g("_content_preview", "")
+                    if preview:
+                        st.write(preview)
+                    phrases_joined = g("_phrases_joined", "")
+                    if phrases_joined:
+                        st.caption("키 프레이즈: " + phrases_joined)
 
             # 유튜브 영상 3개 제공
             st.markdown("---")
             st.markdown(f"### 유튜브에서 '{q}' 관련 영상 3개")
-            # 유튜브 검색 쿼리 생성
-            from urllib.parse import quote_plus
-            yt_query = quote_plus(q + " cartoon")
-            # 유튜브 검색 URL
+            # 유튜브 검색 URL (프리셋은 미리 인코딩된 쿼리 사용)
+            yt_query = YT_QUERIES.get(q) or quote_plus(q + " cartoon")
             yt_search_url = f"https://www.youtube.com/results?search_query={yt_query}"
-            # 임시로 embed, 실제로는 API 필요하지만, 대표 영상 3개만 임베드
-            yt_samples = {
-                "Bluey": [
-                    "https://www.youtube.com/embed/9JkQOYwYv6A",
-                    "https://www.youtube.com/embed/6R3NQb6pQ1w",
-                    "https://www.youtube.com/embed/4b6bLr2Qb6E"
-                ],
-                "Peppa Pig": [
-                    "https://www.youtube.com/embed/9wK6A2eA5nA",
-                    "https://www.youtube.com/embed/1S9UeQnUnxw",
-                    "https://www.youtube.com/embed/2pLT-olgUJs"
-                ],
-                "Dinosaur": [
-                    "https://www.youtube.com/embed/3o5y6z5l5xw",
-                    "https://www.youtube.com/embed/2pLT-olgUJs",
-                    "https://www.youtube.com/embed/1S9UeQnUnxw"
-                ],
-                "Disney/Pixar": [
-                    "https://www.youtube.com/embed/0mvM6p5oQ9A",
-                    "https://www.youtube.com/embed/6Qe6p6p6p6A",
-                    "https://www.youtube.com/embed/7Qe7p7p7p7A"
-                ],
-                "Pororo": [
-                    "https://www.youtube.com/embed/8Qe8p8p8p8A",
-                    "https://www.youtube.com/embed/9Qe9p9p9p9A",
-                    "https://www.youtube.com/embed/0Qe0p0p0p0A"
-                ],
-                "기타": []
-            }
-            yt_videos = yt_samples.get(q, [])
+            yt_videos = YT_SAMPLES.get(q, [])
             if yt_videos:
-                for url in yt_videos:
+                for url, meta in zip(yt_videos, _yt_metadata(tuple(yt_videos))):
+                    if meta and meta.get("title"):
+                        st.caption(meta["title"])
                     st.video(url)
             else:
                 st.markdown(f"[유튜브에서 '{q}' 영상 더 보기]({yt_search_url})")
 
-            if do_rag:
-                messages = build_rag_prompt(q, results)
-                rag = aoai_chat(messages)
-                if rag:
-                    with st.container(border=True):
-                        st.success("RAG 요약 생성됨")
-                        st.markdown("**Child-friendly Summary**")
-                        st.write(rag.get("summary",""))
-                        st.markdown("**Focus Phrases**")
-                        st.write(", ".join(rag.get("focus_phrases", [])))
-                        st.markdown("**Missions (3)**")
-                        for m in rag.get("missions", []):
-                            st.write("- " + m)
-                        st.markdown("**Parent Tips**")
-                        for t in rag.get("parent_tips", []):
-                            st.write("- " + t)
-                        st.download_button("다운로드: RAG 결과(JSON)",
-                                           data=json.dumps(rag, ensure_ascii=False, indent=2),
-                                           file_name="rag_result.json",
-                                           mime="application/json")
-# ...existing code...
+            if rag_future is not None:
+                try:
+                    st.session_state.rag = rag_future.result()
+                except Exception as e:
+                    st.error(f"AOAI 호출 실패: {e}")
+            rag = st.session_state.rag
+            if rag:
+                with st.container(border=True):
+                    st.success("RAG 요약 생성됨")
+                    st.markdown("**Child-friendly Summary**")
+                    st.write(rag.get("summary",""))
+                    st.markdown("**Focus Phrases**")
+                    st.write(", ".join(rag.get("focus_phrases", [])))
+                    st.markdown("**Missions (3)**")
+                    for m in rag.get("missions", []):
+                        st.write("- " + m)
+                    st.markdown("**Parent Tips**")
+                    for t in rag.get("parent_tips", []):
+                        st.write("- " + t)
+                    st.download_button("다운로드: RAG 결과(JSON)",
+                                       data=_json_bytes(rag),
+                                       file_name="rag_result.json",
+                                       mime="application/json")
+
 
 # --- Plan tab ---
-with tabs[1]:
+@st.fragment
+def _plan_tab():
     st.subheader("주간 계획 생성 (룰 기반)")
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -269,22 +420,33 @@ with tabs[1]:
     if st.button("계획 만들기", use_container_width=True):
         plan = rule_based_plan(age, level, character, sessions, minutes)
         st.success("주간 계획이 생성되었습니다.")
+        focus_joined = _FOCUS_JOINED.get(level, _FOCUS_JOINED["A1"])
         for act in plan["activities"]:
             with st.container(border=True):
                 st.markdown(f"**{act['day']}** — {act['item']} ({act['type']})")
-                st.write("키 프레이즈:", ", ".join(act["focus_phrases"]))
-                st.write("미션:", ", ".join(act["missions"]))
+                st.write("키 프레이즈:", focus_joined)
+                st.write("미션:", _MISSIONS_JOINED)
         st.download_button("다운로드: 주간 계획 JSON",
-                           data=json.dumps(plan, ensure_ascii=False, indent=2),
+                           data=_json_bytes(plan),
                            file_name="week_plan.json",
                            mime="application/json")
 
 # --- Settings tab ---
-with tabs[2]:
+@st.fragment
+def _settings_tab():
     st.subheader("환경 상태")
     st.write("Search endpoint:", SEARCH_ENDPOINT or "❌ 미설정")
     st.write("Index:", SEARCH_INDEX or "❌ 미설정")
     st.write("AOAI endpoint:", AOAI_ENDPOINT or "—")
     st.write("AOAI deployment:", AOAI_DEPLOYMENT or "—")
 
+
+# 탭별 fragment: 한 탭의 위젯 조작이 다른 탭의 작업을 다시 실행시키지 않음
+with tabs[0]:
+    _search_tab()
+with tabs[1]:
+    _plan_tab()
+with tabs[2]:
+    _settings_tab()
+
 st.caption("Powered by Azure AI Search + Streamlit")
\ No newline at end of file